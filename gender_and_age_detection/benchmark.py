@@ -0,0 +1,245 @@
+import argparse
+import multiprocessing
+import os
+import time
+from collections import deque
+from functools import partial
+
+import cv2
+import numpy as np
+
+from config import FRAMES_PER_WORKER
+from stub_models import load_stub_models
+from utils import analyze_frame
+from workers import InferenceWorkerPool
+
+def load_frames(video_path=None, num_frames=300, width=640, height=480, seed=0):
+    """
+    This function loads the frames to replay, either from a recorded video or
+    generated synthetically. All frames are loaded in memory before the benchmark
+    so that decoding is not measured.
+
+    Args:
+        video_path (str, optional): Path to a recorded video (default: synthetic frames).
+        num_frames (int, optional): Number of frames to replay (default: 300).
+        width (int, optional): Width of the synthetic frames (default: 640).
+        height (int, optional): Height of the synthetic frames (default: 480).
+        seed (int, optional): Seed for the synthetic frames (default: 0).
+
+    Returns:
+        list: The frames as NumPy arrays in BGR format.
+    """
+    if video_path is None:
+        # Cycle through a few random frames to keep the memory usage low
+        rng = np.random.default_rng(seed)
+        unique_frames = [
+            rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+            for _ in range(min(num_frames, 8))
+        ]
+        return [unique_frames[i % len(unique_frames)] for i in range(num_frames)]
+
+    video_capture = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < num_frames:
+        has_frame, frame = video_capture.read()
+        if not has_frame:
+            break
+        frames.append(frame)
+    video_capture.release()
+
+    if not frames:
+        raise ValueError(f"Could not read any frame from {video_path}")
+
+    return frames
+
+
+def current_memory_mb(pid="self"):
+    """
+    Returns the current resident memory of a process (this one by default) in
+    MB, or None if it can't be measured on this platform (it needs /proc).
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def run_benchmark(frames, model_loader, num_workers=0, warmup=10):
+    """
+    This function replays the frames through the same pipeline as main.py and
+    measures the throughput, the per-frame latency and the memory used on top of
+    the already loaded frames.
+
+    Args:
+        frames (list): The frames to replay.
+        model_loader (callable): Function returning the (face_net, age_net, gender_net) tuple.
+        num_workers (int, optional): Number of worker processes (0 runs in this process).
+        warmup (int, optional): Number of initial frames excluded from the statistics.
+
+    Returns:
+        dict: The benchmark statistics.
+    """
+    # The frames are already loaded, only measure the memory used on top of them
+    baseline_memory = current_memory_mb()
+    max_memory = baseline_memory
+    # pid -> (first, peak) resident memory of each worker process
+    workers_memory = {}
+    submit_times = deque()
+
+    def timed_frames():
+        for frame in frames:
+            submit_times.append(time.perf_counter())
+            yield frame
+
+    pool = None
+    if num_workers > 0:
+        pool = InferenceWorkerPool(
+            num_workers, frames_per_worker=FRAMES_PER_WORKER, model_loader=model_loader
+        )
+        results = pool.imap(timed_frames(), include_dropped=True)
+    else:
+        face_net, age_net, gender_net = model_loader()
+        results = (
+            analyze_frame(face_net, age_net, gender_net, frame)
+            for frame in timed_frames()
+        )
+
+    latencies = []
+    num_faces = 0
+    num_dropped = 0
+    start_time = time.perf_counter()
+    try:
+        # There is exactly one result (None for dropped frames) per input frame
+        for i, result in enumerate(results):
+            end_time = time.perf_counter()
+            latency = end_time - submit_times.popleft()
+            if baseline_memory is not None:
+                max_memory = max(max_memory, current_memory_mb())
+                for process in multiprocessing.active_children():
+                    memory = current_memory_mb(process.pid)
+                    if memory is not None:
+                        first, peak = workers_memory.get(process.pid, (memory, memory))
+                        workers_memory[process.pid] = (first, max(peak, memory))
+
+            # Measure the throughput from the end of the warmup
+            if i < warmup:
+                start_time = end_time
+                continue
+
+            if result is None:
+                num_dropped += 1
+                continue
+
+            latencies.append(latency)
+            num_faces += len(result[1])
+    finally:
+        if pool is not None:
+            pool.close()
+
+    if not latencies:
+        raise ValueError(f"Not enough frames: {len(frames)} with {warmup} warmup frames")
+
+    elapsed = time.perf_counter() - start_time
+    latencies_ms = np.array(latencies) * 1000
+
+    peak_memory = workers_peak_memory = None
+    if baseline_memory is not None:
+        peak_memory = max_memory - baseline_memory
+        # Forked workers share the pages of this process, so each worker is
+        # measured against its own first reading instead
+        if num_workers > 0 and workers_memory:
+            workers_peak_memory = max(
+                peak - first for first, peak in workers_memory.values()
+            )
+
+    return {
+        "frames": len(latencies),
+        "dropped_frames": num_dropped,
+        "faces": num_faces,
+        "fps": len(latencies) / elapsed,
+        "latency_mean_ms": float(latencies_ms.mean()),
+        "latency_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "latency_p90_ms": float(np.percentile(latencies_ms, 90)),
+        "latency_p99_ms": float(np.percentile(latencies_ms, 99)),
+        "latency_max_ms": float(latencies_ms.max()),
+        "peak_memory_mb": peak_memory,
+        "workers_peak_memory_mb": workers_peak_memory,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Replay a frame sequence through the age and gender pipeline "
+        "with stub networks and report its throughput, latency and memory."
+    )
+    parser.add_argument("--video", help="recorded video to replay (default: synthetic)")
+    parser.add_argument("--frames", type=int, default=300, help="frames to replay")
+    parser.add_argument("--width", type=int, default=640, help="synthetic frame width")
+    parser.add_argument("--height", type=int, default=480, help="synthetic frame height")
+    parser.add_argument("--warmup", type=int, default=10, help="frames excluded from stats")
+    parser.add_argument("--faces", type=int, default=1, help="faces per frame")
+    parser.add_argument(
+        "--face-latency", type=float, default=10.0, help="face detection latency (ms)"
+    )
+    parser.add_argument(
+        "--age-latency", type=float, default=3.0, help="age estimation latency (ms)"
+    )
+    parser.add_argument(
+        "--gender-latency", type=float, default=3.0, help="gender latency (ms)"
+    )
+    parser.add_argument(
+        "--sleep",
+        action="store_true",
+        help="sleep during the stub forward passes instead of spinning "
+        "(frees the CPU, so it overestimates the worker pool scaling)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0, help="worker processes (0: main process only)"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    frames = load_frames(args.video, args.frames, args.width, args.height)
+    model_loader = partial(
+        load_stub_models,
+        num_faces=args.faces,
+        face_latency=args.face_latency / 1000,
+        age_latency=args.age_latency / 1000,
+        gender_latency=args.gender_latency / 1000,
+        busy_wait=not args.sleep,
+    )
+
+    print(
+        f"Replaying {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]} "
+        f"with {args.faces} faces per frame and {args.workers} workers..."
+    )
+    stats = run_benchmark(frames, model_loader, args.workers, args.warmup)
+
+    print(
+        f"Frames:  {stats['frames']} ({stats['faces']} faces, "
+        f"{stats['dropped_frames']} dropped)"
+    )
+    print(f"FPS:     {stats['fps']:.1f}")
+    print(
+        f"Latency: mean {stats['latency_mean_ms']:.1f} ms, "
+        f"p50 {stats['latency_p50_ms']:.1f} ms, "
+        f"p90 {stats['latency_p90_ms']:.1f} ms, "
+        f"p99 {stats['latency_p99_ms']:.1f} ms, "
+        f"max {stats['latency_max_ms']:.1f} ms"
+    )
+    if stats["peak_memory_mb"] is not None:
+        print(f"Memory:  peak increase {stats['peak_memory_mb']:.1f} MB")
+    if stats["workers_peak_memory_mb"] is not None:
+        print(
+            f"         worker peak increase {stats['workers_peak_memory_mb']:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# Define paths to pre-trained models
+FACE_DETECTION_PROTOTXT = "models/opencv_face_detector.pbtxt"
+FACE_DETECTION_MODEL = "models/opencv_face_detector_uint8.pb"
+AGE_ESTIMATION_PROTOTXT = "models/age_deploy.prototxt"
+AGE_ESTIMATION_MODEL = "models/age_net.caffemodel"
+GENDER_CLASSIFICATION_PROTOTXT = "models/gender_deploy.prototxt"
+GENDER_CLASSIFICATION_MODEL = "models/gender_net.caffemodel"
+
+# Define the mean values used for pre-processing images
+MODEL_MEAN_VALUES = (78.4263377603, 87.7689143744, 114.895847746)
+
+# Define labels for the age prediction output
+AGE_LABELS = [
+    "(0-2)",
+    "(4-6)",
+    "(8-12)",
+    "(15-20)",
+    "(25-32)",
+    "(38-43)",
+    "(48-53)",
+    "(60-100)",
+]
+
+# Define labels for the gender prediction output
+GENDER_LABELS = ["Male", "Female"]
+
+# Padding for extracting the face region around the bounding box
+FACE_EXTRACTION_PADDING = 20
+
+# WORKER POOL
+# Number of worker processes running inference (0 runs everything in the main process)
+NUM_WORKERS = 0
+# Number of frames that can be queued for each worker at the same time
+FRAMES_PER_WORKER = 2
+# Maximum number of faces reported back by a worker for a single frame
+MAX_FACES_PER_FRAME = 16
+# Seconds a worker can spend on a frame before it is considered hung and replaced
+FRAME_TIMEOUT = 10
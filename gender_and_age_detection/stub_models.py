@@ -0,0 +1,103 @@
+import time
+from functools import partial
+
+import numpy as np
+
+from config import AGE_LABELS, GENDER_LABELS
+
+
+class StubNet:
+    """
+    Stand-in for a cv2.dnn.Net that returns fixed outputs after a configurable
+    latency, so the pipeline can be benchmarked without the real models.
+    """
+
+    def __init__(self, make_output, latency=0.0, busy_wait=True):
+        """
+        Args:
+            make_output (callable): Function returning the output of a forward pass.
+            latency (float, optional): Seconds spent in each forward pass (default: 0).
+            busy_wait (bool, optional): Spin until the forward pass has used `latency`
+                seconds of CPU time, like a real forward pass would, instead of
+                sleeping (default: True).
+        """
+        self.make_output = make_output
+        self.latency = latency
+        self.busy_wait = busy_wait
+        self.forward_count = 0
+
+    def setInput(self, blob):
+        self.input_blob = blob
+
+    def forward(self):
+        if self.busy_wait:
+            # CPU time, so that processes sharing a core can't overlap their passes
+            end_time = time.thread_time() + self.latency
+            while time.thread_time() < end_time:
+                pass
+        elif self.latency > 0:
+            time.sleep(self.latency)
+
+        self.forward_count += 1
+        return self.make_output(self.forward_count)
+
+
+def face_detections(num_faces, forward_count):
+    """
+    Builds a face detection output with `num_faces` faces laid out in a grid,
+    using the same (1, 1, N, 7) layout as the real face detector.
+    """
+    detections = np.zeros((1, 1, num_faces, 7), dtype=np.float32)
+    columns = int(np.ceil(np.sqrt(num_faces))) if num_faces else 1
+    cell_size = 1.0 / columns
+
+    for i in range(num_faces):
+        row, column = divmod(i, columns)
+        x1 = column * cell_size + 0.1 * cell_size
+        y1 = row * cell_size + 0.1 * cell_size
+        detections[0, 0, i] = [
+            0,
+            1,
+            0.99,
+            x1,
+            y1,
+            x1 + 0.8 * cell_size,
+            y1 + 0.8 * cell_size,
+        ]
+
+    return detections
+
+
+def class_predictions(num_labels, forward_count):
+    """
+    Builds a classifier output that cycles through the labels on each call.
+    """
+    predictions = np.zeros((1, num_labels), dtype=np.float32)
+    predictions[0, forward_count % num_labels] = 1.0
+    return predictions
+
+
+def load_stub_models(
+    num_faces=1, face_latency=0.0, age_latency=0.0, gender_latency=0.0, busy_wait=True
+):
+    """
+    This function creates stub networks with the same interface as `utils.load_models`.
+
+    Args:
+        num_faces (int, optional): Number of faces detected in every frame (default: 1).
+        face_latency (float, optional): Seconds spent in each face detection forward pass.
+        age_latency (float, optional): Seconds spent in each age estimation forward pass.
+        gender_latency (float, optional): Seconds spent in each gender classification forward pass.
+        busy_wait (bool, optional): Spin instead of sleeping during the forward passes
+            (default: True).
+
+    Returns:
+        tuple: A tuple containing the stub face_net, age_net and gender_net.
+    """
+    face_net = StubNet(partial(face_detections, num_faces), face_latency, busy_wait)
+    age_net = StubNet(partial(class_predictions, len(AGE_LABELS)), age_latency, busy_wait)
+    gender_net = StubNet(
+        partial(class_predictions, len(GENDER_LABELS)), gender_latency, busy_wait
+    )
+
+    return face_net, age_net, gender_net
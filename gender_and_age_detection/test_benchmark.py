@@ -0,0 +1,51 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from benchmark import load_frames, run_benchmark
+from stub_models import StubNet, face_detections, load_stub_models
+
+
+class FailingNet(StubNet):
+    """
+    Face detection stub that raises on bright frames.
+    """
+
+    def forward(self):
+        if self.input_blob.max() > 100:
+            raise ValueError("Invalid frame")
+        return super().forward()
+
+
+def load_failing_models():
+    _, age_net, gender_net = load_stub_models(num_faces=2)
+    return FailingNet(partial(face_detections, 2)), age_net, gender_net
+
+
+@pytest.mark.parametrize("num_workers", [0, 2])
+def test_run_benchmark_counts_every_frame(num_workers):
+    frames = load_frames(num_frames=20, width=160, height=120)
+    model_loader = partial(load_stub_models, num_faces=2)
+
+    stats = run_benchmark(frames, model_loader, num_workers=num_workers, warmup=5)
+
+    assert stats["frames"] == len(frames) - 5
+    assert stats["faces"] == 2 * (len(frames) - 5)
+    assert stats["dropped_frames"] == 0
+    assert stats["fps"] > 0
+    assert stats["latency_p50_ms"] <= stats["latency_p99_ms"]
+    if num_workers == 0:
+        assert stats["workers_peak_memory_mb"] is None
+
+
+def test_run_benchmark_counts_dropped_frames():
+    frames = [np.zeros((120, 160, 3), dtype=np.uint8) for _ in range(20)]
+    frames[10] = np.full((120, 160, 3), 255, dtype=np.uint8)
+    frames[15] = np.full((120, 160, 3), 255, dtype=np.uint8)
+
+    stats = run_benchmark(frames, load_failing_models, num_workers=2, warmup=5)
+
+    assert stats["dropped_frames"] == 2
+    assert stats["frames"] == len(frames) - 5 - 2
+    assert stats["faces"] == 2 * stats["frames"]
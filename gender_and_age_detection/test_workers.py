@@ -0,0 +1,136 @@
+import itertools
+import time
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from stub_models import StubNet, face_detections, load_stub_models
+from workers import InferenceWorkerPool
+
+FRAME_SHAPE = (300, 400, 3)
+
+
+def make_frame(value):
+    # The top left pixel is never drawn on, so it identifies the frame
+    return np.full(FRAME_SHAPE, value, dtype=np.uint8)
+
+
+def frame_value(result_image):
+    return int(result_image[0, 0, 0])
+
+
+class FailingNet(StubNet):
+    """
+    Face detection stub that raises on bright frames.
+    """
+
+    def forward(self):
+        if self.input_blob.max() > 100:
+            raise ValueError("Invalid frame")
+        return super().forward()
+
+
+def load_failing_models():
+    _, age_net, gender_net = load_stub_models()
+    return FailingNet(partial(face_detections, 1)), age_net, gender_net
+
+
+class HangingNet(StubNet):
+    """
+    Face detection stub that never returns on bright frames.
+    """
+
+    def forward(self):
+        if self.input_blob.max() > 100:
+            time.sleep(3600)
+        return super().forward()
+
+
+def load_hanging_models():
+    _, age_net, gender_net = load_stub_models()
+    return HangingNet(partial(face_detections, 1)), age_net, gender_net
+
+
+def load_broken_models():
+    raise FileNotFoundError("models/opencv_face_detector_uint8.pb")
+
+
+def test_imap_keeps_input_order():
+    frames = [make_frame(i) for i in range(40)]
+
+    with InferenceWorkerPool(2, model_loader=load_stub_models) as pool:
+        results = list(pool.imap(frames))
+
+    assert [frame_value(image) for image, _ in results] == list(range(40))
+    assert all(len(face_predictions) == 1 for _, face_predictions in results)
+
+
+def test_imap_recovers_from_killed_worker():
+    # Endless input, like a webcam: the crash has to be handled mid-stream
+    frames = (make_frame(i % 200) for i in itertools.count())
+    model_loader = partial(load_stub_models, face_latency=0.005)
+
+    values = []
+    with InferenceWorkerPool(3, model_loader=model_loader) as pool:
+        for result_image, _ in pool.imap(frames):
+            if not values:
+                process, _ = next(iter(pool._workers.values()))
+                process.kill()
+
+            assert len(pool._completed) <= pool.num_slots
+            values.append(frame_value(result_image))
+            if len(values) == 200:
+                break
+
+    assert values == list(range(200))
+
+
+def test_imap_drops_failing_frames():
+    values = [0, 1, 255, 3, 4]
+
+    with InferenceWorkerPool(2, model_loader=load_failing_models) as pool:
+        results = list(pool.imap(make_frame(value) for value in values))
+
+    assert [frame_value(image) for image, _ in results] == [0, 1, 3, 4]
+
+
+def test_imap_replaces_hung_workers():
+    values = [0, 1, 255, 3, 4]
+
+    with InferenceWorkerPool(
+        2, frame_timeout=0.5, model_loader=load_hanging_models
+    ) as pool:
+        results = list(pool.imap(make_frame(value) for value in values))
+
+    assert [frame_value(image) for image, _ in results] == [0, 1, 3, 4]
+
+
+def test_imap_raises_when_models_fail_to_load():
+    with InferenceWorkerPool(2, model_loader=load_broken_models) as pool:
+        with pytest.raises(RuntimeError, match="failed to start"):
+            list(pool.imap([make_frame(0)]))
+
+
+def test_close_releases_shared_memory():
+    pool = InferenceWorkerPool(2, model_loader=load_stub_models)
+    list(pool.imap([make_frame(0), make_frame(1)]))
+    names = [shm.name for shm in pool._shared_memory]
+    pool.close()
+
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_imap_includes_dropped_frames():
+    values = [0, 255, 2]
+
+    with InferenceWorkerPool(2, model_loader=load_failing_models) as pool:
+        results = list(
+            pool.imap((make_frame(value) for value in values), include_dropped=True)
+        )
+
+    assert results[1] is None
+    assert [frame_value(results[0][0]), frame_value(results[2][0])] == [0, 2]
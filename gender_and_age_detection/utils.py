@@ -1,5 +1,38 @@
 import cv2
 
+from config import (
+    AGE_ESTIMATION_MODEL,
+    AGE_ESTIMATION_PROTOTXT,
+    AGE_LABELS,
+    FACE_DETECTION_MODEL,
+    FACE_DETECTION_PROTOTXT,
+    FACE_EXTRACTION_PADDING,
+    GENDER_CLASSIFICATION_MODEL,
+    GENDER_CLASSIFICATION_PROTOTXT,
+    GENDER_LABELS,
+    MODEL_MEAN_VALUES,
+)
+
+
+def load_models():
+    """
+    This function loads the pre-trained networks used for face detection, age
+    estimation and gender classification.
+
+    Returns:
+        tuple: A tuple containing three elements:
+            - face_net (cv2.dnn.Net): The face detection network.
+            - age_net (cv2.dnn.Net): The age estimation network.
+            - gender_net (cv2.dnn.Net): The gender classification network.
+    """
+    face_net = cv2.dnn.readNet(FACE_DETECTION_MODEL, FACE_DETECTION_PROTOTXT)
+    age_net = cv2.dnn.readNet(AGE_ESTIMATION_MODEL, AGE_ESTIMATION_PROTOTXT)
+    gender_net = cv2.dnn.readNet(
+        GENDER_CLASSIFICATION_MODEL, GENDER_CLASSIFICATION_PROTOTXT
+    )
+
+    return face_net, age_net, gender_net
+
 
 def detect_faces_in_frame(face_detection_net, frame, confidence_threshold=0.7):
     """
@@ -70,3 +103,101 @@ def detect_faces_in_frame(face_detection_net, frame, confidence_threshold=0.7):
 
     # Return the frame with highlighted faces and the list of face bounding boxes
     return frame_with_highlights, detected_face_boxes
+
+
+def predict_gender_and_age(age_net, gender_net, frame, face_box):
+    """
+    This function predicts the gender and age range of a detected face.
+
+    Args:
+        age_net (cv2.dnn.Net): The pre-trained deep learning network for age estimation.
+        gender_net (cv2.dnn.Net): The pre-trained deep learning network for gender classification.
+        frame (np.ndarray): The input frame as a NumPy array (assumed to be in BGR format).
+        face_box (list): The coordinates [x1, y1, x2, y2] of the detected face.
+
+    Returns:
+        tuple: A tuple containing two elements:
+            - gender_index (int): Index of the predicted label in GENDER_LABELS.
+            - age_index (int): Index of the predicted label in AGE_LABELS.
+    """
+
+    # Extract the face region from the original frame based on the bounding box
+    face = frame[
+        max(0, face_box[1] - FACE_EXTRACTION_PADDING) : min(
+            face_box[3] + FACE_EXTRACTION_PADDING, frame.shape[0] - 1
+        ),
+        max(0, face_box[0] - FACE_EXTRACTION_PADDING) : min(
+            face_box[2] + FACE_EXTRACTION_PADDING, frame.shape[1] - 1
+        ),
+    ]
+
+    # Create a blob from the extracted face region for feeding into the network
+    blob = cv2.dnn.blobFromImage(
+        face, 1.0, (227, 227), MODEL_MEAN_VALUES, swapRB=False
+    )
+
+    # Set the network input for gender prediction
+    gender_net.setInput(blob)
+    gender_predictions = gender_net.forward()
+
+    # Set the network input for age prediction (using the same blob)
+    age_net.setInput(blob)
+    age_predictions = age_net.forward()
+
+    # Return the indexes with highest probability
+    return int(gender_predictions[0].argmax()), int(age_predictions[0].argmax())
+
+
+def draw_gender_and_age(image, face_box, gender_index, age_index):
+    """
+    This function draws the predicted gender and age range above a detected face.
+
+    Args:
+        image (np.ndarray): The image to draw on (modified in place).
+        face_box (list): The coordinates [x1, y1, x2, y2] of the detected face.
+        gender_index (int): Index of the predicted label in GENDER_LABELS.
+        age_index (int): Index of the predicted label in AGE_LABELS.
+    """
+    cv2.putText(
+        image,
+        f"{GENDER_LABELS[gender_index]}, {AGE_LABELS[age_index]}",
+        (face_box[0], face_box[1] - 10),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        0.8,
+        (0, 255, 255),
+        2,
+        cv2.LINE_AA,
+    )
+
+
+def analyze_frame(face_net, age_net, gender_net, frame):
+    """
+    This function runs the full pipeline on a frame: it detects the faces, predicts
+    the gender and age range of each one and draws the results.
+
+    Args:
+        face_net (cv2.dnn.Net): The pre-trained deep learning network for face detection.
+        age_net (cv2.dnn.Net): The pre-trained deep learning network for age estimation.
+        gender_net (cv2.dnn.Net): The pre-trained deep learning network for gender classification.
+        frame (np.ndarray): The input frame as a NumPy array (assumed to be in BGR format).
+
+    Returns:
+        tuple: A tuple containing two elements:
+            - result_image (np.ndarray): The frame copy with highlighted faces and labels.
+            - face_predictions (list): A list of (face_box, gender_index, age_index) tuples,
+              one for each detected face (empty if none were found).
+    """
+
+    # Detect faces in the frame
+    result_image, face_boxes = detect_faces_in_frame(face_net, frame)
+
+    # Predict gender and age for each detected face and draw the labels
+    face_predictions = []
+    for face_box in face_boxes:
+        gender_index, age_index = predict_gender_and_age(
+            age_net, gender_net, frame, face_box
+        )
+        draw_gender_and_age(result_image, face_box, gender_index, age_index)
+        face_predictions.append((face_box, gender_index, age_index))
+
+    return result_image, face_predictions
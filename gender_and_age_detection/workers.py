@@ -0,0 +1,495 @@
+import multiprocessing
+import os
+import time
+import traceback
+from multiprocessing import connection, shared_memory
+
+import cv2
+import numpy as np
+
+from config import FRAME_TIMEOUT, FRAMES_PER_WORKER, MAX_FACES_PER_FRAME
+from utils import analyze_frame, load_models
+
+# Number of values stored for each face in the results array:
+# x1, y1, x2, y2, gender_index, age_index
+RESULT_FIELDS = 6
+
+# Seconds to wait for a worker message before checking that the workers are alive
+POLL_INTERVAL = 0.1
+
+
+def _inference_worker(
+    worker_connection,
+    frames_in_name,
+    frames_out_name,
+    results_name,
+    frame_shape,
+    frame_dtype,
+    num_slots,
+    max_faces,
+    model_loader,
+):
+    """
+    Entry point of a worker process. It loads its own copy of the networks with
+    `model_loader` and processes the ring buffer slots it receives until it gets
+    a None task.
+
+    Frames are read from and written to shared memory, only the (seq, slot) pair
+    and a small status message go through the worker's own pipe.
+    """
+
+    # Each worker is single-threaded so that the pool scales with the processes
+    cv2.setNumThreads(1)
+
+    try:
+        face_net, age_net, gender_net = model_loader()
+        frames_in_shm = shared_memory.SharedMemory(name=frames_in_name)
+        frames_out_shm = shared_memory.SharedMemory(name=frames_out_name)
+        results_shm = shared_memory.SharedMemory(name=results_name)
+    except Exception:
+        worker_connection.send(("fatal", -1, -1, traceback.format_exc()))
+        return
+
+    frames_in = np.ndarray(
+        (num_slots, *frame_shape), dtype=frame_dtype, buffer=frames_in_shm.buf
+    )
+    frames_out = np.ndarray(
+        (num_slots, *frame_shape), dtype=frame_dtype, buffer=frames_out_shm.buf
+    )
+    results = np.ndarray(
+        (num_slots, max_faces, RESULT_FIELDS), dtype=np.int32, buffer=results_shm.buf
+    )
+
+    try:
+        worker_connection.send(("ready", -1, -1, None))
+
+        while True:
+            try:
+                task = worker_connection.recv()
+            except EOFError:
+                # The pool was closed without stopping this worker
+                break
+            if task is None:
+                break
+            seq, slot = task
+
+            try:
+                result_image, face_predictions = analyze_frame(
+                    face_net, age_net, gender_net, frames_in[slot]
+                )
+            except Exception:
+                worker_connection.send(("error", seq, slot, traceback.format_exc()))
+                continue
+
+            # Write the annotated frame and the compact predictions back
+            frames_out[slot] = result_image
+            num_faces = min(len(face_predictions), max_faces)
+            for i, (face_box, gender_index, age_index) in enumerate(
+                face_predictions[:num_faces]
+            ):
+                results[slot, i] = (*face_box, gender_index, age_index)
+
+            worker_connection.send(("done", seq, slot, num_faces))
+    finally:
+        # Release the views before closing the shared memory blocks
+        del frames_in, frames_out, results
+        frames_in_shm.close()
+        frames_out_shm.close()
+        results_shm.close()
+
+
+class InferenceWorkerPool:
+    """
+    Runs the age and gender pipeline on a pool of worker processes.
+
+    Frames are copied into a shared memory ring buffer instead of being pickled.
+    Each worker holds its own face_net, age_net and gender_net, writes the
+    annotated frame into an output ring buffer and the detected faces into a
+    compact shared results array. Results are returned in the same order as the
+    input frames.
+
+    Each worker talks to the pool through its own pipe, so a worker that dies
+    can't block the others. If a worker dies, or takes longer than
+    `frame_timeout` on a frame, it is replaced and the frames it was processing
+    are sent to another worker. A frame that keeps failing is dropped after
+    `max_retries` attempts.
+
+    The main process still copies every annotated frame out of the ring buffer
+    and reorders the results, which caps the throughput of the pool.
+
+    Usage:
+        with InferenceWorkerPool(num_workers=4) as pool:
+            for result_image, face_predictions in pool.imap(frames):
+                ...
+    """
+
+    def __init__(
+        self,
+        num_workers=None,
+        frames_per_worker=FRAMES_PER_WORKER,
+        max_faces=MAX_FACES_PER_FRAME,
+        max_retries=1,
+        frame_timeout=FRAME_TIMEOUT,
+        model_loader=load_models,
+    ):
+        """
+        Args:
+            num_workers (int, optional): Number of worker processes (default: number of CPUs).
+            frames_per_worker (int, optional): Ring buffer slots reserved for each worker.
+            max_faces (int, optional): Maximum number of faces reported for a single frame.
+            max_retries (int, optional): Times a frame is resubmitted after its worker died.
+            frame_timeout (float, optional): Seconds a worker can spend on a frame before
+                it is considered hung and replaced.
+            model_loader (callable, optional): Picklable function returning the
+                (face_net, age_net, gender_net) tuple of each worker (default: `utils.load_models`).
+        """
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.num_slots = self.num_workers * frames_per_worker
+        self.frames_per_worker = frames_per_worker
+        self.max_faces = max_faces
+        self.max_retries = max_retries
+        self.frame_timeout = frame_timeout
+        self.model_loader = model_loader
+
+        self._context = multiprocessing.get_context()
+        self._shared_memory = []
+        self._frame_shape = None
+        self._frame_dtype = None
+
+        # worker_id -> (process, connection)
+        self._workers = {}
+        # Workers that finished loading their models
+        self._ready_workers = set()
+        self._next_worker_id = 0
+        self._restarts_left = self.num_workers
+        self._last_check_time = time.monotonic()
+
+        # seq -> [worker_id, slot, attempts, dispatch_time]
+        self._in_flight = {}
+        # seq -> (slot, face_predictions), or None for dropped frames. The slot
+        # stays reserved until the frame is yielded, so the ring buffer also
+        # bounds the frames waiting to be reordered.
+        self._completed = {}
+        self._free_slots = []
+        self._next_seq = 0
+        self._next_output_seq = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def imap(self, frames, include_dropped=False):
+        """
+        Processes an iterable of frames on the worker pool.
+
+        Args:
+            frames (iterable): Frames as NumPy arrays, all with the same shape and dtype.
+            include_dropped (bool, optional): Yield None in place of the dropped frames,
+                so that every input frame has exactly one output (default: False).
+
+        Yields:
+            tuple: (result_image, face_predictions) for each frame, in input order,
+            with the same format returned by `utils.analyze_frame`.
+        """
+        frames = iter(frames)
+        exhausted = False
+
+        while True:
+            # Keep every free slot of the ring buffer busy
+            while not exhausted and (self._free_slots or self._frame_shape is None):
+                frame = next(frames, None)
+                if frame is None:
+                    exhausted = True
+                else:
+                    self._submit(frame)
+
+            # Emit the results that are ready, preserving the input order
+            while self._next_output_seq in self._completed:
+                result = self._completed.pop(self._next_output_seq)
+                self._next_output_seq += 1
+                if result is None:
+                    if include_dropped:
+                        yield None
+                    continue
+
+                slot, face_predictions = result
+                result_image = self._frames_out[slot].copy()
+                self._free_slots.append(slot)
+                yield result_image, face_predictions
+
+            if not self._in_flight:
+                if exhausted:
+                    return
+                continue
+
+            self._collect()
+
+    def close(self):
+        """
+        Stops the worker processes and releases the shared memory.
+        """
+        for process, worker_connection in self._workers.values():
+            try:
+                worker_connection.send(None)
+            except OSError:
+                pass
+        for process, worker_connection in self._workers.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+            worker_connection.close()
+        self._workers = {}
+        self._ready_workers = set()
+
+        # Release the views before closing the shared memory blocks
+        self._frames_in = self._frames_out = self._results = None
+        for shm in self._shared_memory:
+            shm.close()
+            shm.unlink()
+        self._shared_memory = []
+
+    def _start(self, frame_shape, frame_dtype):
+        """
+        Allocates the shared memory for the given frame format and starts the workers.
+        """
+        self._frame_shape = frame_shape
+        self._frame_dtype = frame_dtype
+        frame_size = int(np.prod(frame_shape)) * frame_dtype.itemsize
+        results_size = self.max_faces * RESULT_FIELDS * np.dtype(np.int32).itemsize
+
+        frames_in_shm = shared_memory.SharedMemory(
+            create=True, size=self.num_slots * frame_size
+        )
+        frames_out_shm = shared_memory.SharedMemory(
+            create=True, size=self.num_slots * frame_size
+        )
+        results_shm = shared_memory.SharedMemory(
+            create=True, size=self.num_slots * results_size
+        )
+        self._shared_memory = [frames_in_shm, frames_out_shm, results_shm]
+
+        self._frames_in = np.ndarray(
+            (self.num_slots, *frame_shape), dtype=frame_dtype, buffer=frames_in_shm.buf
+        )
+        self._frames_out = np.ndarray(
+            (self.num_slots, *frame_shape), dtype=frame_dtype, buffer=frames_out_shm.buf
+        )
+        self._results = np.ndarray(
+            (self.num_slots, self.max_faces, RESULT_FIELDS),
+            dtype=np.int32,
+            buffer=results_shm.buf,
+        )
+        self._free_slots = list(range(self.num_slots))
+
+        for _ in range(self.num_workers):
+            self._spawn_worker()
+
+    def _spawn_worker(self):
+        """
+        Starts a new worker process with its own pipe.
+        """
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+
+        pool_connection, worker_connection = self._context.Pipe()
+        process = self._context.Process(
+            target=_inference_worker,
+            args=(
+                worker_connection,
+                *(shm.name for shm in self._shared_memory),
+                self._frame_shape,
+                self._frame_dtype.str,
+                self.num_slots,
+                self.max_faces,
+                self.model_loader,
+            ),
+            daemon=True,
+        )
+        process.start()
+
+        # Only the worker keeps its end open, so the pool gets EOF if it dies
+        worker_connection.close()
+        self._workers[worker_id] = (process, pool_connection)
+
+    def _submit(self, frame):
+        """
+        Copies a frame into a free ring buffer slot and sends it to a worker.
+        """
+        if self._frame_shape is None:
+            self._start(frame.shape, frame.dtype)
+        elif frame.shape != self._frame_shape or frame.dtype != self._frame_dtype:
+            raise ValueError(
+                f"Invalid frame: expected shape {self._frame_shape} and dtype "
+                f"{self._frame_dtype}, got {frame.shape} and {frame.dtype}."
+            )
+
+        slot = self._free_slots.pop()
+        self._frames_in[slot] = frame
+
+        seq = self._next_seq
+        self._next_seq += 1
+        self._in_flight[seq] = [None, slot, 0, None]
+        self._dispatch(seq)
+
+    def _dispatch(self, seq):
+        """
+        Sends an in-flight frame to the least busy worker that is still alive.
+        """
+        if not any(process.is_alive() for process, _ in self._workers.values()):
+            self._check_workers()
+
+        load = {
+            worker_id: 0
+            for worker_id, (process, _) in self._workers.items()
+            if process.is_alive()
+        }
+        for task in self._in_flight.values():
+            if task[0] in load:
+                load[task[0]] += 1
+        worker_id = min(load, key=load.get)
+
+        task = self._in_flight[seq]
+        task[0] = worker_id
+        task[2] += 1
+        task[3] = time.monotonic()
+        try:
+            self._workers[worker_id][1].send((seq, task[1]))
+        except OSError:
+            # The worker just died, the frame is resubmitted when it is replaced
+            pass
+
+    def _collect(self):
+        """
+        Waits for worker messages and stores the finished frames. Crashed and
+        hung workers are replaced every POLL_INTERVAL, even while the other
+        workers keep sending results.
+        """
+        if time.monotonic() - self._last_check_time >= POLL_INTERVAL:
+            self._check_workers()
+
+        worker_ids = {
+            worker_connection: worker_id
+            for worker_id, (_, worker_connection) in self._workers.items()
+        }
+        ready_connections = connection.wait(list(worker_ids), timeout=POLL_INTERVAL)
+        if not ready_connections:
+            self._check_workers()
+            return
+
+        crashed_workers = []
+        for worker_connection in ready_connections:
+            worker_id = worker_ids[worker_connection]
+            try:
+                message = worker_connection.recv()
+            except (EOFError, OSError):
+                crashed_workers.append(worker_id)
+                continue
+            self._handle_message(worker_id, *message)
+
+        if crashed_workers:
+            self._replace_workers(crashed_workers)
+
+    def _handle_message(self, worker_id, status, seq, slot, payload):
+        """
+        Processes a message sent by a worker.
+        """
+        if status == "fatal":
+            self.close()
+            raise RuntimeError(f"Inference worker failed to start:\n{payload}")
+
+        if status == "ready":
+            # Loading the models doesn't count towards the frame timeout
+            self._ready_workers.add(worker_id)
+            for task in self._in_flight.values():
+                if task[0] == worker_id:
+                    task[3] = time.monotonic()
+            return
+
+        # Ignore late messages for frames that were already resubmitted
+        task = self._in_flight.get(seq)
+        if task is None or task[0] != worker_id:
+            return
+
+        if status == "error":
+            print(f"Dropping frame {seq}, inference failed:\n{payload}")
+            self._drop(seq)
+            return
+
+        num_faces = payload
+        face_predictions = [
+            (row[:4].tolist(), int(row[4]), int(row[5]))
+            for row in self._results[slot, :num_faces]
+        ]
+        del self._in_flight[seq]
+        self._completed[seq] = (slot, face_predictions)
+
+    def _drop(self, seq):
+        """
+        Gives up on a frame and returns its slot to the ring buffer.
+        """
+        slot = self._in_flight.pop(seq)[1]
+        self._free_slots.append(slot)
+        self._completed[seq] = None
+
+    def _check_workers(self):
+        """
+        Replaces the workers that died or are stuck on a frame.
+        """
+        self._last_check_time = time.monotonic()
+
+        failed_workers = {
+            worker_id
+            for worker_id, (process, _) in self._workers.items()
+            if not process.is_alive()
+        }
+        for seq, (worker_id, _, _, dispatch_time) in self._in_flight.items():
+            if (
+                worker_id in self._ready_workers
+                and self._last_check_time - dispatch_time > self.frame_timeout
+            ):
+                print(f"Inference worker {worker_id} timed out on frame {seq}")
+                failed_workers.add(worker_id)
+
+        if failed_workers:
+            self._replace_workers(failed_workers)
+
+    def _replace_workers(self, worker_ids):
+        """
+        Stops the given workers, starts replacements and resubmits the frames
+        they were processing.
+        """
+        for worker_id in worker_ids:
+            if worker_id not in self._workers:
+                continue
+            process, worker_connection = self._workers.pop(worker_id)
+            self._ready_workers.discard(worker_id)
+
+            # Discard the pipe, a hung worker is killed before being replaced
+            worker_connection.close()
+            if process.is_alive():
+                process.kill()
+            process.join()
+            print(f"Inference worker {worker_id} died (exit code {process.exitcode})")
+
+            if self._restarts_left <= 0:
+                continue
+            self._restarts_left -= 1
+            self._spawn_worker()
+
+        if not self._workers:
+            self.close()
+            raise RuntimeError("All inference workers died.")
+
+        for seq in list(self._in_flight):
+            # Read the task again, a nested check may have resubmitted it already
+            task = self._in_flight.get(seq)
+            if task is None or task[0] not in worker_ids:
+                continue
+            if task[2] > self.max_retries:
+                print(f"Dropping frame {seq}, its worker failed {task[2]} times")
+                self._drop(seq)
+            else:
+                self._dispatch(seq)